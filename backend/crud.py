@@ -1,8 +1,12 @@
 # crud.py
+from sqlalchemy import func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 from typing import List
+import threading
 import models
 import schemas
+from product_events import hub
 
 # Custom Exceptions for business logic
 class ProductNotFoundException(Exception):
@@ -12,6 +16,13 @@ class InsufficientStockException(Exception):
 
 # --- Product CRUD ---
 
+# Held across a product change's commit and its event, so terminals receive
+# events in commit order and never keep a stale snapshot after coalescing
+_commit_publish_lock = threading.Lock()
+
+def _product_snapshot(db_product: models.Product):
+    return schemas.Product.model_validate(db_product).model_dump()
+
 def get_product(db: Session, product_id: int):
     return db.query(models.Product).filter(models.Product.id == product_id).first()
 
@@ -24,8 +35,10 @@ def get_products(db: Session, skip: int = 0, limit: int = 100):
 def create_product(db: Session, product: schemas.ProductCreate):
     db_product = models.Product(**product.model_dump())
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    with _commit_publish_lock:
+        db.commit()
+        db.refresh(db_product)
+        hub.product_updated(_product_snapshot(db_product))
     return db_product
 
 def update_product(db: Session, product_id: int, product_update: schemas.ProductUpdate):
@@ -36,8 +49,10 @@ def update_product(db: Session, product_id: int, product_update: schemas.Product
     update_data = product_update.model_dump(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_product, key, value)
-    db.commit()
-    db.refresh(db_product)
+    with _commit_publish_lock:
+        db.commit()
+        db.refresh(db_product)
+        hub.product_updated(_product_snapshot(db_product))
     return db_product
 
 def delete_product(db: Session, product_id: int):
@@ -45,9 +60,45 @@ def delete_product(db: Session, product_id: int):
     if not db_product:
         raise ProductNotFoundException(f"Product with id {product_id} not found")
     db.delete(db_product)
-    db.commit()
+    with _commit_publish_lock:
+        db.commit()
+        hub.product_deleted(product_id)
     return db_product
 
+def upsert_products(db: Session, products: List[schemas.ProductCreate]):
+    """
+    Inserts or updates a batch of products keyed on their unique name,
+    using a single INSERT ... ON CONFLICT statement and one commit.
+    Returns a tuple of (inserted, updated) counts.
+    """
+    # Later rows win if the same name appears more than once in the batch
+    rows = {product.name: product.model_dump() for product in products}
+    if not rows:
+        return 0, 0
+
+    existing = set(
+        db.execute(select(models.Product.name).where(models.Product.name.in_(rows.keys()))).scalars()
+    )
+    stmt = sqlite_insert(models.Product)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Product.name],
+        set_={
+            # A missing description keeps the current one rather than clearing it
+            "description": func.coalesce(stmt.excluded.description, models.Product.description),
+            "price": stmt.excluded.price,
+            "stock_quantity": stmt.excluded.stock_quantity,
+        },
+    )
+    try:
+        db.execute(stmt, list(rows.values()))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise e
+
+    updated = len(products) - len(rows) + len(existing)
+    return len(products) - updated, updated
+
 # --- Sale CRUD ---
 
 TAX_RATE = 0.16 # 16% VAT
@@ -62,6 +113,7 @@ def create_sale(
     try:
         subtotal = 0
         processed_items = []
+        changed_products = {}
 
         for item in sale_items:
             # Lock the product row for update to prevent race conditions
@@ -74,6 +126,8 @@ def create_sale(
             product.stock_quantity -= item.quantity
             subtotal += product.price * item.quantity
             processed_items.append({"product_id": item.product_id, "quantity": item.quantity, "price_at_sale": product.price})
+            # Snapshot now, since the commit below expires the loaded attributes
+            changed_products[product.id] = _product_snapshot(product)
 
         tax_amount = (subtotal - discount_amount) * TAX_RATE
         total_amount = (subtotal - discount_amount) + tax_amount
@@ -88,14 +142,19 @@ def create_sale(
             db_sale.zra_response_log = str(zra_response)
             db_sale.zra_sync_status = models.SyncStatus.SYNCED
 
-        db.add(db_sale)
-        db.flush() # Use flush to get the db_sale.id before commit
+        # Take the lock before the first write, so it is always acquired
+        # ahead of SQLite's write lock and the two can never deadlock
+        with _commit_publish_lock:
+            db.add(db_sale)
+            db.flush() # Use flush to get the db_sale.id before commit
 
-        for p_item in processed_items:
-            db_item = models.SaleItem(sale_id=db_sale.id, **p_item)
-            db.add(db_item)
-        
-        db.commit()
+            for p_item in processed_items:
+                db_item = models.SaleItem(sale_id=db_sale.id, **p_item)
+                db.add(db_item)
+
+            db.commit()
+            for product in changed_products.values():
+                hub.product_updated(product)
         db.refresh(db_sale)
         return db_sale
     except Exception as e:
@@ -109,7 +168,6 @@ def get_sales(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Sale).offset(skip).limit(limit).all()
 
 # --- Reporting ---
-from sqlalchemy import func
 from datetime import date
 
 def get_sales_summary_by_day(db: Session, day: date):
@@ -1,13 +1,19 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 import datetime
+import json
+import tempfile
 from typing import List
 
 import crud
 import models
+import product_import
 import schemas
+from product_events import hub as product_event_hub
 from database import SessionLocal, engine, Base
 from mock_zra_server import app as mock_zra_app
 
@@ -50,6 +56,83 @@ def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)
         raise HTTPException(status_code=400, detail="Product with this name already exists")
     return crud.create_product(db=db, product=product)
 
+MAX_BULK_UPLOAD_BYTES = 200 * 1024 * 1024
+
+@app.post(
+    "/products/bulk",
+    response_model=schemas.BulkImportSummary,
+    tags=["Products"],
+    responses={
+        413: {"description": "Upload is too large"},
+        415: {"description": "Upload must be text/csv or application/x-ndjson"},
+    },
+    # The body is read as a raw stream, so describe it here for the spec
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/x-ndjson": {"schema": {"type": "string"}},
+            },
+        }
+    },
+)
+async def bulk_import_products(request: Request, db: Session = Depends(get_db)):
+    """
+    Upserts a whole catalog keyed on product name. The request body is a CSV
+    (with a header row) or NDJSON stream, selected by the Content-Type header.
+    """
+    fmt = product_import.detect_format(request.headers.get("content-type", ""))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Upload must be text/csv or application/x-ndjson")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BULK_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Upload is too large")
+
+    # Spool the body as it arrives so large catalogs don't have to fit in memory
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as upload:
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > MAX_BULK_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Upload is too large")
+            # Past max_size the spool is on disk, so write from a worker thread
+            await run_in_threadpool(upload.write, chunk)
+        await run_in_threadpool(upload.seek, 0)
+        # Parsing and the batched upserts are blocking, so keep them off the event loop
+        return await run_in_threadpool(product_import.import_products, db, upload, fmt)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+@app.get(
+    "/products/events",
+    response_class=StreamingResponse,
+    tags=["Products"],
+    responses={200: {"description": "Stream of product change events", "content": {"text/event-stream": {}}}},
+)
+async def stream_product_events():
+    """
+    Server-Sent Events stream of product changes (product_updated,
+    product_deleted and resync), so terminals don't have to poll the catalog.
+    Rapid changes to the same product are coalesced into the latest state.
+    """
+    async def event_stream():
+        with product_event_hub.subscribe() as subscriber:
+            while True:
+                events = await subscriber.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if not events:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                for event in events:
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/products/", response_model=List[schemas.Product], tags=["Products"])
 def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     products = crud.get_products(db, skip=skip, limit=limit)
@@ -0,0 +1,88 @@
+# product_events.py
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Hashable, List
+
+MAX_PENDING_EVENTS = 1000 # Per subscriber; a slower consumer is told to resync instead
+RESYNC_KEY = None
+
+class Subscriber:
+    """
+    A single listener's queue of pending events, keyed by product so that
+    repeated changes to the same product collapse into the latest one.
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_pending: int):
+        self._loop = loop
+        self._max_pending = max_pending
+        self._pending = OrderedDict()
+        self._lock = threading.Lock()
+        self._ready = asyncio.Event()
+
+    def push(self, key: Hashable, event: dict):
+        # Called from whichever thread made the change, so it must never block
+        with self._lock:
+            wake = not self._pending
+            if key not in self._pending and len(self._pending) >= self._max_pending:
+                self._pending.clear()
+                key, event = RESYNC_KEY, {"type": "resync"}
+            self._pending[key] = event
+        if wake:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass # The subscriber's event loop has already shut down
+
+    async def get(self, timeout: float) -> List[dict]:
+        """
+        Waits up to `timeout` seconds for events and returns everything pending.
+        An empty list means nothing changed in that time.
+        """
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return []
+        self._ready.clear()
+        with self._lock:
+            events = list(self._pending.values())
+            self._pending.clear()
+        return events
+
+class ProductEventHub:
+    """
+    In-process fan-out of product changes to every connected terminal.
+    """
+    def __init__(self, max_pending: int = MAX_PENDING_EVENTS):
+        self._max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def subscribe(self):
+        subscriber = Subscriber(asyncio.get_running_loop(), self._max_pending)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def publish(self, key: Hashable, event: dict):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.push(key, event)
+
+    def product_updated(self, product: dict):
+        self.publish(product["id"], {"type": "product_updated", "product": product})
+
+    def product_deleted(self, product_id: int):
+        self.publish(product_id, {"type": "product_deleted", "id": product_id})
+
+    def catalog_changed(self):
+        # Too many changes to send individually; terminals should refetch the catalog
+        self.publish(RESYNC_KEY, {"type": "resync"})
+
+hub = ProductEventHub()
@@ -0,0 +1,154 @@
+# product_import.py
+import csv
+import json
+import math
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+import crud
+import schemas
+from product_events import hub
+
+BATCH_SIZE = 500 # Rows per upsert statement and commit
+MAX_REPORTED_ERRORS = 100 # Rejected rows beyond this are counted but not listed
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+def detect_format(content_type: str) -> Optional[str]:
+    media_type = content_type.split(";")[0].strip().lower()
+    return CONTENT_TYPES.get(media_type)
+
+EXTRA_CELLS_KEY = "__extra_cells__"
+
+class _DecodedLines:
+    """
+    Decodes an upload one physical line at a time. Lines that are not valid
+    UTF-8 are recorded and replaced by a blank line, so a single bad byte
+    only rejects its own row and line numbers stay aligned with the file.
+    """
+    def __init__(self, upload: BinaryIO):
+        self._upload = upload
+        self.line_num = 0
+        self.errors = []
+
+    def __iter__(self):
+        for raw in self._upload:
+            self.line_num += 1
+            try:
+                yield raw.decode("utf-8-sig" if self.line_num == 1 else "utf-8")
+            except UnicodeDecodeError as e:
+                self.errors.append((self.line_num, f"Invalid UTF-8 at byte {e.start}: {e.reason}"))
+                yield "\n"
+
+def _iter_csv_records(lines: _DecodedLines) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(lines, restkey=EXTRA_CELLS_KEY)
+    while True:
+        try:
+            record = next(reader)
+        except StopIteration:
+            record = None
+        except csv.Error as e:
+            record = ValueError(f"Malformed CSV: {e}")
+        # Undecodable lines read while fetching this record come before it in the file
+        while lines.errors:
+            yield lines.errors.pop(0)
+        if record is None:
+            return
+        if isinstance(record, dict):
+            if EXTRA_CELLS_KEY in record:
+                record = ValueError("Row has more cells than the header")
+            else:
+                # Treat empty cells as missing so optional fields fall back to their defaults
+                record = {key: value for key, value in record.items() if value not in ("", None)}
+        yield reader.line_num, record
+
+def _iter_ndjson_records(lines: _DecodedLines) -> Iterator[Tuple[int, object]]:
+    for line in lines:
+        if lines.errors:
+            yield lines.errors.pop()
+        elif line.strip():
+            try:
+                yield lines.line_num, json.loads(line)
+            except json.JSONDecodeError as e:
+                yield lines.line_num, ValueError(f"Invalid JSON: {e.msg}")
+
+def _parse_record(record: object) -> Tuple[Optional[schemas.ProductCreate], Optional[str]]:
+    if isinstance(record, (str, ValueError)):
+        return None, str(record)
+    if not isinstance(record, dict):
+        return None, "Row must be an object"
+    try:
+        product = schemas.ProductCreate(**record)
+    except ValidationError as e:
+        return None, "; ".join(
+            f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in e.errors()
+        )
+    except TypeError as e:
+        return None, f"Invalid row: {e}"
+    if not product.name.strip():
+        return None, "name: must not be blank"
+    if not math.isfinite(product.price):
+        return None, "price: must be a finite number"
+    return product, None
+
+def iter_products(upload: BinaryIO, fmt: str) -> Iterator[Tuple[int, Optional[schemas.ProductCreate], Optional[str]]]:
+    """
+    Parses an uploaded catalog one row at a time, yielding
+    (row number, product, error) with exactly one of product/error set.
+    Every data row is yielded exactly once, whether or not it is readable.
+    """
+    lines = _DecodedLines(upload)
+    records = _iter_csv_records(lines) if fmt == "csv" else _iter_ndjson_records(lines)
+    for row_num, record in records:
+        product, error = _parse_record(record)
+        yield row_num, product, error
+
+def import_products(db: Session, upload: BinaryIO, fmt: str, batch_size: int = BATCH_SIZE) -> schemas.BulkImportSummary:
+    """
+    Upserts every valid row of an uploaded catalog in batches, committing
+    after each batch, and returns a summary of the outcome.
+    """
+    summary = schemas.BulkImportSummary()
+    batch = []
+
+    def reject(row_num: int, error: str):
+        summary.rejected += 1
+        if len(summary.errors) < MAX_REPORTED_ERRORS:
+            summary.errors.append(schemas.BulkImportError(row=row_num, error=error))
+
+    def flush():
+        try:
+            inserted, updated = crud.upsert_products(db, [product for _, product in batch])
+        except SQLAlchemyError as e:
+            # The whole batch was rolled back, so every row in it is rejected
+            error = f"Database error: {getattr(e, 'orig', None) or e}"
+            for row_num, _ in batch:
+                reject(row_num, error)
+        else:
+            summary.inserted += inserted
+            summary.updated += updated
+        batch.clear()
+
+    try:
+        for row_num, product, error in iter_products(upload, fmt):
+            if error:
+                reject(row_num, error)
+                continue
+            batch.append((row_num, product))
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        # Tell terminals about batches that were committed, even if a later step failed
+        if summary.inserted or summary.updated:
+            hub.catalog_changed()
+    return summary
@@ -66,4 +66,16 @@ class ZRAInvoiceSubmission(BaseModel):
     transaction_id: str
     total_amount: float
     tax_amount: float
-    items: List[ZRAInvoiceItem]
\ No newline at end of file
+    items: List[ZRAInvoiceItem]
+
+# --- Bulk Import Schemas ---
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportSummary(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: List[BulkImportError] = []